@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import TradeDetails
+from .models import TradeDetails, Instrument, FxRate, ArchivedTrade, TradeArchivePeriod
 
 # Register the TradeDetails model
 admin.site.register(TradeDetails)
+admin.site.register(Instrument)
+admin.site.register(FxRate)
+admin.site.register(ArchivedTrade)
+admin.site.register(TradeArchivePeriod)
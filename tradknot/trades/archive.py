@@ -0,0 +1,154 @@
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .fx import FxRates, annotate_contract_pnl, as_date
+from .models import ArchivedTrade, TradeArchivePeriod, TradeDetails
+
+# Closed months are moved out of TradeDetails into ArchivedTrade, so the tradebook and
+# performance queries only scan recent trades. Each archived month keeps a
+# TradeArchivePeriod rollup in the base currency; performance() chains the rollups with
+# the live trades so lifetime totals, win rate and drawdown are unchanged. A trade
+# backdated into an archived month is chained after the archive until that month is
+# archived again, which rebuilds its rollup. Loading new or corrected FX rates rebuilds
+# the rollups of the months they apply to.
+
+TRADE_FIELDS = [field.attname for field in ArchivedTrade._meta.concrete_fields]
+
+
+def _month_start(value):
+    return value.replace(day=1)
+
+
+def _next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _months_filter(months):
+    query = Q()
+    for month in months:
+        query |= Q(trade_datetime__gte=_aware(month), trade_datetime__lt=_aware(_next_month(month)))
+    return query
+
+
+# function to build one rollup per month from a user's trades, oldest first
+def build_periods(user, trades):
+    # wins use the same price rule as performance() so archiving never moves a trade between
+    # the win and loss counts
+    rows = list(annotate_contract_pnl(trades.with_result()).order_by('trade_datetime', 'id')
+                .values_list('currency', 'trade_date', 'contract_pnl', 'result'))
+    rates = FxRates()
+    rates.load({row[0] for row in rows})
+    periods = {}
+    for currency, trade_date, amount, result in rows:
+        trade_date = as_date(trade_date)
+        pnl = amount * rates(currency, trade_date)
+        month = _month_start(trade_date)
+        period = periods.get(month)
+        if period is None:
+            period = periods[month] = TradeArchivePeriod(user=user, month=month, pnl=Decimal(0))
+        period.trade_count += 1
+        period.win_count += result
+        period.pnl += pnl
+        # running pnl within the month, measured from zero at the start of the month
+        if period.trade_count == 1:
+            period.max_running_pnl = period.min_running_pnl = period.pnl
+        else:
+            period.max_running_pnl = max(period.max_running_pnl, period.pnl)
+            period.min_running_pnl = min(period.min_running_pnl, period.pnl)
+        period.max_drawdown = max(period.max_drawdown, period.max_running_pnl - period.pnl)
+    return list(periods.values())
+
+
+# function to chain archived month rollups, returns (cumulative pnl, peak value, max drawdown)
+def fold_periods(periods):
+    cumulative = Decimal(0)
+    peak_value = None
+    max_drawdown = Decimal(0)
+    for period in periods:
+        if peak_value is not None:
+            max_drawdown = max(max_drawdown, peak_value - (cumulative + period.min_running_pnl))
+        max_drawdown = max(max_drawdown, period.max_drawdown)
+        month_peak = cumulative + period.max_running_pnl
+        peak_value = month_peak if peak_value is None else max(peak_value, month_peak)
+        cumulative += period.pnl
+    return cumulative, peak_value, max_drawdown
+
+
+def _rebuild_months(user, months):
+    trades = ArchivedTrade.objects.filter(_months_filter(months), user=user)
+    periods = build_periods(user, trades)
+    TradeArchivePeriod.objects.filter(user=user, month__in=months).delete()
+    TradeArchivePeriod.objects.bulk_create(periods)
+    return len(periods)
+
+
+# function to rebuild the archived months that use FX rates changed from a date onwards,
+# given as {currency: first changed date}; returns the number of months rebuilt
+def rebuild_periods_for_rates(changed_since):
+    query = Q()
+    for currency, first_date in changed_since.items():
+        query |= Q(instrument__currency=currency, trade_datetime__gte=_aware(first_date))
+    if not query:
+        return 0
+    affected = ArchivedTrade.objects.filter(query)
+    rebuilt = 0
+    with transaction.atomic():
+        for user in User.objects.filter(pk__in=affected.values('user_id')):
+            rebuilt += _rebuild_months(user, list(affected.filter(user=user).dates('trade_datetime', 'month')))
+    return rebuilt
+
+
+def _restore_months(user, months):
+    archived = ArchivedTrade.objects.filter(_months_filter(months), user=user)
+    trades = [TradeDetails(**values) for values in archived.values(*TRADE_FIELDS)]
+    TradeDetails.objects.bulk_create(trades, batch_size=1000)
+    archived.delete()
+    TradeArchivePeriod.objects.filter(user=user, month__in=months).delete()
+    return len(trades)
+
+
+# function to move a user's trades from months before `before` into the archive
+def archive_trades(user, before):
+    before = _month_start(before)
+    # only closed months; archiving the current month would send its new trades down the
+    # backdated path, where lifetime drawdown is no longer exact
+    current_month = _month_start(timezone.localdate())
+    if before > current_month:
+        raise ValueError(f"Only closed months can be archived, use a date up to {current_month}")
+    with transaction.atomic():
+        trades = TradeDetails.objects.filter(user=user, trade_datetime__lt=_aware(before))
+
+        # backdated trades in an already archived month: pull the month back and rebuild it
+        months = trades.dates('trade_datetime', 'month')
+        archived_months = list(TradeArchivePeriod.objects.filter(user=user, month__in=list(months))
+                               .values_list('month', flat=True))
+        if archived_months:
+            _restore_months(user, archived_months)
+
+        periods = build_periods(user, trades)
+        archived = [ArchivedTrade(**values) for values in trades.values(*TRADE_FIELDS)]
+        ArchivedTrade.objects.bulk_create(archived, batch_size=1000)
+        trades.delete()
+        TradeArchivePeriod.objects.bulk_create(periods)
+    return len(archived)
+
+
+# function to move a user's archived trades from `since` onwards (default: all) back into TradeDetails
+def restore_trades(user, since=None):
+    periods = TradeArchivePeriod.objects.filter(user=user)
+    if since is not None:
+        periods = periods.filter(month__gte=_month_start(since))
+    with transaction.atomic():
+        months = list(periods.values_list('month', flat=True))
+        if not months:
+            return 0
+        return _restore_months(user, months)
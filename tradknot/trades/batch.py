@@ -0,0 +1,21 @@
+import time
+
+from django.contrib.auth.models import User
+
+from .importer import import_tradebook
+
+
+# Worker functions run through trades.parallel.run_parallel; each returns a label, row counts or
+# messages and the elapsed seconds so the calling command can report throughput.
+
+
+def import_file(user_id, path):
+    # a file that fails is reported back instead of raised, so one bad file doesn't abort
+    # the other workers; each file is imported in its own transaction
+    started = time.perf_counter()
+    try:
+        user = User.objects.get(pk=user_id)
+        count, errors = import_tradebook(user, path)
+    except Exception as e:
+        return path, 0, [], time.perf_counter() - started, f"{type(e).__name__}: {e}"
+    return path, count, errors, time.perf_counter() - started, None
@@ -6,7 +6,7 @@ from .models import TradeDetails
 class TradeDetailsForm(forms.ModelForm):
     class Meta:
         model = TradeDetails
-        fields = ['trade_datetime', 'trade_symbol', 'trade_type', 'entry_price', 'exit_price', 'quantity',
+        fields = ['trade_datetime', 'trade_symbol', 'instrument', 'trade_type', 'entry_price', 'exit_price', 'quantity',
                   'trade_rationale', 'outcome_analysis', 'emotional_state', 'lessons_learned', 'notes']
         # Customize widgets or add validation if needed
         widgets = {
@@ -0,0 +1,153 @@
+import csv
+import io
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils.dateparse import parse_date
+
+from .models import FxRate
+
+
+class FxRateMissing(LookupError):
+    def __init__(self, currency, on_date):
+        self.currency = currency
+        self.on_date = on_date
+        super().__init__(f"No FX rate for {currency} on or before {on_date}")
+
+
+class FxRates:
+    # Rates into the base currency used during one aggregation. All rates of the currencies
+    # involved are fetched in one query and looked up as of each trade date in Python, so a
+    # report costs one rate query however many days it spans. A fresh instance is used per
+    # aggregation so newly loaded or corrected rates are seen on the next request.
+    def __init__(self):
+        self._dates = {}
+        self._rates = {}
+
+    def load(self, currencies):
+        missing = {currency for currency in currencies
+                   if currency != settings.BASE_CURRENCY and currency not in self._dates}
+        if not missing:
+            return
+        for currency in missing:
+            self._dates[currency] = []
+            self._rates[currency] = []
+        rows = (FxRate.objects.filter(currency__in=missing)
+                .order_by('currency', 'date').values_list('currency', 'date', 'rate'))
+        for currency, rate_date, rate in rows:
+            self._dates[currency].append(rate_date)
+            self._rates[currency].append(rate)
+
+    def __call__(self, currency, on_date):
+        if currency == settings.BASE_CURRENCY:
+            return Decimal(1)
+        self.load([currency])
+        # use the most recent published rate, so weekends and holidays fall back to the last close
+        index = bisect_right(self._dates[currency], on_date)
+        if index == 0:
+            raise FxRateMissing(currency, on_date)
+        return self._rates[currency][index - 1]
+
+
+# function to load FX rates from a CSV with date,currency,rate columns,
+# returns the number of rates loaded and the number of archived months rebuilt
+def load_fx_rates(csv_file):
+    if isinstance(csv_file, (str, bytes)) or hasattr(csv_file, '__fspath__'):
+        with open(csv_file, newline='') as f:
+            return load_fx_rates(f)
+
+    text = csv_file.read()
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+
+    rates = []
+    for row in csv.DictReader(io.StringIO(text)):
+        rate_date = parse_date(row['date'].strip())
+        if rate_date is None:
+            raise ValueError(f"Invalid date in FX rate row: {row}")
+        rates.append(FxRate(
+            currency=row['currency'].strip().upper(),
+            date=rate_date,
+            rate=Decimal(row['rate'].strip()),
+        ))
+
+    # archived months keep rollups converted at archive time, so the months that a new or
+    # corrected rate applies to are rebuilt; imported here as trades.archive imports this module
+    from .archive import rebuild_periods_for_rates
+
+    existing = {}
+    if rates:
+        rows = (FxRate.objects.filter(currency__in={rate.currency for rate in rates},
+                                      date__gte=min(rate.date for rate in rates))
+                .values_list('currency', 'date', 'rate'))
+        existing = {(currency, rate_date): rate for currency, rate_date, rate in rows}
+    changed_since = {}
+    for rate in rates:
+        if existing.get((rate.currency, rate.date)) != rate.rate:
+            first = changed_since.get(rate.currency)
+            changed_since[rate.currency] = rate.date if first is None else min(first, rate.date)
+
+    with transaction.atomic():
+        FxRate.objects.bulk_create(
+            rates,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['currency', 'date'],
+            update_fields=['rate'],
+        )
+        rebuilt = rebuild_periods_for_rates(changed_since)
+    return len(rates), rebuilt
+
+
+# function to annotate trades with their currency, trade date and pnl scaled by the contract multiplier
+def annotate_contract_pnl(trades):
+    return trades.annotate(
+        currency=Coalesce('instrument__currency', Value(settings.BASE_CURRENCY)),
+        trade_date=TruncDate('trade_datetime'),
+        contract_pnl=F('db_pnl') * Coalesce(
+            'instrument__multiplier', Value(Decimal(1)), output_field=DecimalField()
+        ),
+    )
+
+
+# function to total pnl in the base currency, grouping by (currency, date) in the database
+def total_pnl_in_base(trades, rates=None):
+    rates = rates or FxRates()
+    groups = list(annotate_contract_pnl(trades).order_by()
+                  .values('currency', 'trade_date')
+                  .annotate(amount=Sum('contract_pnl')))
+    rates.load({group['currency'] for group in groups})
+    total = Decimal(0)
+    for group in groups:
+        total += group['amount'] * rates(group['currency'], as_date(group['trade_date']))
+    return total
+
+
+# function to yield each trade's date and pnl in the base currency, oldest first
+def iter_dated_pnl_in_base(trades, rates=None):
+    rates = rates or FxRates()
+    rows = list(annotate_contract_pnl(trades).order_by('trade_datetime', 'id')
+                .values_list('currency', 'trade_date', 'contract_pnl'))
+    rates.load({currency for currency, _, _ in rows})
+    for currency, trade_date, amount in rows:
+        trade_date = as_date(trade_date)
+        yield trade_date, amount * rates(currency, trade_date)
+
+
+# function to yield each trade's pnl in the base currency, oldest first
+def iter_pnl_in_base(trades, rates=None):
+    for _, amount in iter_dated_pnl_in_base(trades, rates):
+        yield amount
+
+
+# function to normalise a date returned by the database
+def as_date(value):
+    # sqlite hands back TruncDate results as strings
+    if isinstance(value, date):
+        return value
+    return parse_date(value)
@@ -0,0 +1,109 @@
+from decimal import Decimal
+
+import pandas as pd
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Instrument, TradeDetails
+
+TRADEBOOK_COLUMNS = ['symbol', 'trade_type', 'quantity', 'price', 'order_execution_time']
+
+
+# function to collapse a broker tradebook (one row per execution) into one realised trade per symbol
+def summarise_tradebook(df):
+    missing = [column for column in TRADEBOOK_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Tradebook is missing columns: {', '.join(missing)}")
+
+    is_buy = df.trade_type == 'buy'
+    value = df.quantity * df.price
+    df = df.assign(
+        buy_qty=df.quantity.where(is_buy, 0),
+        sell_qty=df.quantity.where(~is_buy, 0),
+        buy_value=value.where(is_buy, 0),
+        sell_value=value.where(~is_buy, 0),
+    )
+    # one pass over the executions; symbols keep the order they first appear in
+    grouped = df.groupby('symbol', sort=False).agg(
+        order_execution_time=('order_execution_time', 'first'),
+        trade_type=('trade_type', 'first'),
+        tot_buy_qty=('buy_qty', 'sum'),
+        tot_sell_qty=('sell_qty', 'sum'),
+        total_buy_value=('buy_value', 'sum'),
+        total_sell_value=('sell_value', 'sum'),
+    )
+
+    results = []
+    for symbol, row in grouped.iterrows():
+        tot_buy_qty = row.tot_buy_qty
+        tot_sell_qty = row.tot_sell_qty
+
+        # Skip processing if there's no buy or sell
+        if tot_buy_qty == 0 or tot_sell_qty == 0:
+            continue
+
+        unrealised_qty = tot_buy_qty - tot_sell_qty
+        realised_qty = max((tot_buy_qty + tot_sell_qty - abs(unrealised_qty)) / 2, 1)
+
+        buy_avg = round(row.total_buy_value / tot_buy_qty, 2)
+        sell_avg = round(row.total_sell_value / realised_qty, 2) if unrealised_qty <= 0 else round(
+            row.total_sell_value / tot_sell_qty, 2)
+
+        results.append({
+            'order_execution_time': row.order_execution_time,
+            'symbol': symbol,
+            'type': row.trade_type,
+            'buy_avg': buy_avg,
+            'sell_avg': sell_avg,
+            'qty': realised_qty,
+            'realised_pnl': (sell_avg - buy_avg) * realised_qty,
+        })
+
+    return results
+
+
+# function to build unsaved TradeDetails rows for a user from summarised results,
+# returns the trades and a message for every row that had to be skipped
+def build_trades(user, results):
+    # only link symbols that are listed on a single exchange, as TradeDetails.resolve_instrument does
+    listings = {}
+    for instrument in Instrument.objects.filter(symbol__in={r['symbol'] for r in results}):
+        listings.setdefault(instrument.symbol, []).append(instrument)
+    instruments = {symbol: found[0] for symbol, found in listings.items() if len(found) == 1}
+
+    symbol_length = TradeDetails._meta.get_field('trade_symbol').max_length
+    trades = []
+    errors = []
+    for result in results:
+        try:
+            trade_datetime = parse_datetime(str(result['order_execution_time']))
+            if trade_datetime is None:
+                raise ValueError("invalid order_execution_time")
+            if len(result['symbol']) > symbol_length:
+                raise ValueError(f"symbol longer than {symbol_length} characters")
+            trade = TradeDetails(
+                user=user,
+                trade_datetime=trade_datetime,
+                trade_symbol=result['symbol'],
+                instrument=instruments.get(result['symbol']),
+                trade_type=result['type'].capitalize(),  # 'Buy' or 'Sell'
+                entry_price=Decimal(result['buy_avg']),
+                exit_price=Decimal(result['sell_avg']),
+                quantity=int(float(result['qty'])),
+                source='CSV'
+            )
+        except Exception as e:
+            errors.append(f"{result.get('symbol')}: {e}")
+            continue
+        trades.append(trade)
+    return trades, errors
+
+
+# function to import a broker tradebook CSV for a user,
+# returns the number of trades created and the messages for skipped rows
+def import_tradebook(user, csv_file, batch_size=1000):
+    df = pd.read_csv(csv_file)
+    trades, errors = build_trades(user, summarise_tradebook(df))
+    with transaction.atomic():
+        TradeDetails.objects.bulk_create(trades, batch_size=batch_size)
+    return len(trades), errors
@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from trades.archive import archive_trades
+from trades.fx import FxRateMissing
+
+
+class Command(BaseCommand):
+    help = "Move trades from months before --before into the archive, keeping monthly rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='users to archive (default: all users)')
+        parser.add_argument('--before', required=True,
+                            help='archive whole months before this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        before = parse_date(options['before'])
+        if before is None:
+            raise CommandError(f"Invalid date: {options['before']}")
+
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        total = 0
+        for user in users:
+            try:
+                count = archive_trades(user, before)
+            except (FxRateMissing, ValueError) as e:
+                raise CommandError(f"{user.username}: {e}")
+            self.stdout.write(f"{user.username}: {count} trades archived")
+            total += count
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} trades before {before.replace(day=1)}"))
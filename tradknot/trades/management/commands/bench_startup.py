@@ -0,0 +1,70 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: load the WSGI app and the URLconf (which imports every
+# view module) the way a web worker does before serving its first request.
+WORKER_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss //= 1024  # bytes on macOS, KiB elsewhere
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_kib': rss,
+    'modules': sorted(m for m in %(heavy)r if m in sys.modules),
+}))
+"""
+
+# modules that only the CSV import path needs; a worker should never load them at startup
+HEAVY_MODULES = ('pandas', 'numpy')
+
+
+class Command(BaseCommand):
+    help = "Measure web worker cold-start import time and peak RSS, failing if heavy modules load."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='number of fresh interpreters to start')
+        parser.add_argument('--max-seconds', type=float, default=None,
+                            help='fail if the median startup time exceeds this')
+        parser.add_argument('--max-rss-mib', type=float, default=None,
+                            help='fail if the largest peak RSS exceeds this')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'tradknot.settings')
+        script = WORKER_SCRIPT % {'heavy': HEAVY_MODULES}
+
+        samples = []
+        for _ in range(options['runs']):
+            result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(f"Worker failed to start:\n{result.stderr}")
+            samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+        seconds = statistics.median(sample['seconds'] for sample in samples)
+        rss_mib = max(sample['rss_kib'] for sample in samples) / 1024
+        loaded = sorted({module for sample in samples for module in sample['modules']})
+        self.stdout.write(f"startup: median {seconds * 1000:.0f} ms over {len(samples)} runs, "
+                          f"peak RSS {rss_mib:.1f} MiB")
+
+        problems = []
+        if loaded:
+            problems.append(f"worker imported {', '.join(loaded)} at startup")
+        if options['max_seconds'] is not None and seconds > options['max_seconds']:
+            problems.append(f"median startup {seconds:.3f}s exceeds {options['max_seconds']}s")
+        if options['max_rss_mib'] is not None and rss_mib > options['max_rss_mib']:
+            problems.append(f"peak RSS {rss_mib:.1f} MiB exceeds {options['max_rss_mib']} MiB")
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS("No heavy modules loaded at startup"))
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from trades.batch import import_file
+from trades.parallel import run_parallel
+
+
+class Command(BaseCommand):
+    help = "Import broker tradebook CSV files for a user, in parallel across worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='user the trades belong to')
+        parser.add_argument('paths', nargs='+', help='tradebook CSV files to import')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='number of worker processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        missing = [path for path in options['paths'] if not os.path.isfile(path)]
+        if missing:
+            raise CommandError(f"No such file: {', '.join(missing)}")
+
+        tasks = [(user.pk, path) for path in options['paths']]
+        started = time.perf_counter()
+        total = skipped = 0
+        failed = []
+        for path, count, errors, seconds, failure in run_parallel(import_file, tasks, options['workers']):
+            if failure:
+                self.stdout.write(self.style.ERROR(f"{path}: failed, {failure}"))
+                failed.append(path)
+                continue
+            self.stdout.write(f"{path}: {count} trades, {len(errors)} rows skipped in {seconds:.2f}s")
+            for error in errors:
+                self.stdout.write(self.style.WARNING(f"  skipped {error}"))
+            total += count
+            skipped += len(errors)
+        elapsed = time.perf_counter() - started
+
+        rate = (total + skipped) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {total} trades ({skipped} rows skipped) from {len(tasks) - len(failed)} files "
+            f"in {elapsed:.2f}s ({rate:.0f} rows/s)"
+        ))
+        if failed:
+            raise CommandError(f"{len(failed)} of {len(tasks)} files failed: {', '.join(failed)}")
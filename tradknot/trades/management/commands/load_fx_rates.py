@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trades.fx import load_fx_rates
+
+
+class Command(BaseCommand):
+    help = "Load FX rates into the base currency from CSV files with date,currency,rate columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='CSV files to load')
+
+    def handle(self, *args, **options):
+        total = 0
+        for path in options['paths']:
+            try:
+                count, rebuilt = load_fx_rates(path)
+            except (OSError, KeyError, ValueError, ArithmeticError) as e:
+                raise CommandError(f"{path}: {e}")
+            self.stdout.write(f"{path}: {count} rates")
+            if rebuilt:
+                self.stdout.write(f"{path}: rebuilt {rebuilt} archived months for the changed rates")
+            total += count
+        self.stdout.write(self.style.SUCCESS(f"Loaded {total} FX rates"))
@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from trades.fx import FxRateMissing
+from trades.replay import load_trade_arrays, replay
+
+# run when no --variants file is given: a sizing sweep, with and without emotional trades
+DEFAULT_SIZES = [0.25, 0.5, 0.75, 1, 1.5, 2]
+DEFAULT_SKIP_EMOTIONS = ['fomo', 'fear', 'greed', 'revenge', 'anxious', 'emotional']
+
+
+class Command(BaseCommand):
+    help = "Replay a user's trades under sizing and filter rule variants and compare equity and drawdown."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='user whose trades are replayed')
+        parser.add_argument('--variants', default=None,
+                            help='JSON file with a list of variants (see trades/replay.py)')
+        parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+        parser.add_argument('--top', type=int, default=20, help='number of variants to print')
+        parser.add_argument('--no-archive', action='store_true', help='ignore archived trades')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        if options['variants']:
+            try:
+                with open(options['variants']) as f:
+                    variants = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"{options['variants']}: {e}")
+        else:
+            variants = [{'name': 'recorded'}]
+            for size in DEFAULT_SIZES:
+                variants.append({'name': f"size x{size}", 'size': size})
+                variants.append({'name': f"size x{size}, skip emotional", 'size': size,
+                                 'skip_emotions': DEFAULT_SKIP_EMOTIONS})
+
+        started = time.perf_counter()
+        try:
+            arrays = load_trade_arrays(user, include_archived=not options['no_archive'])
+        except FxRateMissing as e:
+            raise CommandError(str(e))
+        loaded = time.perf_counter()
+        try:
+            results = replay(arrays, variants, options['workers'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        finished = time.perf_counter()
+
+        self.stdout.write(f"{len(arrays)} trades loaded in {loaded - started:.2f}s, "
+                          f"{len(results)} variants evaluated in {finished - loaded:.2f}s")
+        self.stdout.write(f"{'variant':<36} {'trades':>7} {'win %':>7} {'total pnl':>14} "
+                          f"{'max dd':>14} {'max dd %':>9}")
+        for result in sorted(results, key=lambda r: r['total_pnl'], reverse=True)[:options['top']]:
+            self.stdout.write(f"{result['name'][:36]:<36} {result['trades']:>7} {result['win_rate']:>7.2f} "
+                              f"{result['total_pnl']:>14.2f} {result['max_drawdown']:>14.2f} "
+                              f"{result['max_drawdown_percentage']:>9.2f}")
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from trades.archive import restore_trades
+
+
+class Command(BaseCommand):
+    help = "Move archived trades back into the trades table and drop their monthly rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='users to restore (default: all users)')
+        parser.add_argument('--since', default=None,
+                            help='only restore months from this date onwards (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid date: {options['since']}")
+
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        total = 0
+        for user in users:
+            count = restore_trades(user, since)
+            self.stdout.write(f"{user.username}: {count} trades restored")
+            total += count
+        self.stdout.write(self.style.SUCCESS(f"Restored {total} trades"))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeDetails',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trade_datetime', models.DateTimeField()),
+                ('trade_symbol', models.CharField(max_length=10)),
+                ('trade_type', models.CharField(choices=[('Buy', 'Buy'), ('Sell', 'Sell')], max_length=4)),
+                ('entry_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('exit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.IntegerField()),
+                ('pnl', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('trade_rationale', models.TextField(blank=True, null=True)),
+                ('outcome_analysis', models.TextField(blank=True, null=True)),
+                ('emotional_state', models.TextField(blank=True, null=True)),
+                ('lessons_learned', models.TextField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('source', models.CharField(choices=[('CSV', 'CSV'), ('Manual', 'Manual')], default='Manual', max_length=10)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-trade_datetime'],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+            ],
+            options={
+                'ordering': ['currency', '-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Instrument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=32)),
+                ('exchange', models.CharField(blank=True, default='', max_length=16)),
+                ('currency', models.CharField(max_length=3)),
+                ('lot_size', models.PositiveIntegerField(default=1)),
+                ('multiplier', models.DecimalField(decimal_places=4, default=1, max_digits=12)),
+            ],
+            options={
+                'ordering': ['symbol'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='instrument',
+            constraint=models.UniqueConstraint(fields=('symbol', 'exchange'), name='unique_instrument_symbol_exchange'),
+        ),
+        migrations.AddConstraint(
+            model_name='fxrate',
+            constraint=models.UniqueConstraint(fields=('currency', 'date'), name='unique_fxrate_currency_date'),
+        ),
+        migrations.AddField(
+            model_name='tradedetails',
+            name='instrument',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='trades.instrument'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0002_instrument_fxrate'),
+    ]
+
+    # pnl is now computed from the prices (TradeDetails.pnl and the db_pnl annotation).
+    # Reversing this migration adds the column back filled with zeros, not the old values.
+    operations = [
+        migrations.RemoveField(
+            model_name='tradedetails',
+            name='pnl',
+        ),
+    ]
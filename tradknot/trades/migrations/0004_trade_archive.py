@@ -0,0 +1,80 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trades', '0003_computed_pnl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTrade',
+            fields=[
+                ('trade_datetime', models.DateTimeField()),
+                ('trade_symbol', models.CharField(max_length=10)),
+                ('trade_type', models.CharField(choices=[('Buy', 'Buy'), ('Sell', 'Sell')], max_length=4)),
+                ('entry_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('exit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.IntegerField()),
+                ('trade_rationale', models.TextField(blank=True, null=True)),
+                ('outcome_analysis', models.TextField(blank=True, null=True)),
+                ('emotional_state', models.TextField(blank=True, null=True)),
+                ('lessons_learned', models.TextField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('source', models.CharField(choices=[('CSV', 'CSV'), ('Manual', 'Manual')], default='Manual', max_length=10)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'ordering': ['-trade_datetime'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TradeArchivePeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('trade_count', models.IntegerField(default=0)),
+                ('win_count', models.IntegerField(default=0)),
+                ('pnl', models.DecimalField(decimal_places=8, default=0, max_digits=24)),
+                ('max_running_pnl', models.DecimalField(decimal_places=8, default=0, max_digits=24)),
+                ('min_running_pnl', models.DecimalField(decimal_places=8, default=0, max_digits=24)),
+                ('max_drawdown', models.DecimalField(decimal_places=8, default=0, max_digits=24)),
+            ],
+            options={
+                'ordering': ['user', 'month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tradedetails',
+            index=models.Index(fields=['user', 'trade_datetime'], name='trades_trad_user_id_085dc4_idx'),
+        ),
+        migrations.AddField(
+            model_name='tradearchiveperiod',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedtrade',
+            name='instrument',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='trades.instrument'),
+        ),
+        migrations.AddField(
+            model_name='archivedtrade',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='tradearchiveperiod',
+            constraint=models.UniqueConstraint(fields=('user', 'month'), name='unique_archive_period_user_month'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtrade',
+            index=models.Index(fields=['user', 'trade_datetime'], name='trades_arch_user_id_df5df7_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0004_trade_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedtrade',
+            name='trade_symbol',
+            field=models.CharField(max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='tradedetails',
+            name='trade_symbol',
+            field=models.CharField(max_length=32),
+        ),
+    ]
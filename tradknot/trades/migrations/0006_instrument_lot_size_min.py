@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:50
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def fix_zero_lot_sizes(apps, schema_editor):
+    # a lot size of 0 made TradeDetails.clean() divide by zero; treat it as no lot constraint
+    Instrument = apps.get_model('trades', 'Instrument')
+    Instrument.objects.filter(lot_size=0).update(lot_size=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0005_widen_trade_symbol'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='instrument',
+            name='lot_size',
+            field=models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.RunPython(fix_zero_lot_sizes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='instrument',
+            constraint=models.CheckConstraint(check=models.Q(('lot_size__gte', 1)), name='instrument_lot_size_gte_1'),
+        ),
+    ]
@@ -1,10 +1,84 @@
 from django.db import models
+from django.db.models import Case, F, Value, When
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 
 
-class TradeDetails(models.Model):
+class Instrument(models.Model):
+    symbol = models.CharField(max_length=32)
+    exchange = models.CharField(max_length=16, blank=True, default='')
+    currency = models.CharField(max_length=3)
+    # minimum tradable quantity; trade quantities must be a multiple of it
+    lot_size = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    # contract multiplier applied to (price move * quantity) to get money pnl
+    multiplier = models.DecimalField(max_digits=12, decimal_places=4, default=1)
+
+    def __str__(self):
+        if self.exchange:
+            return f"{self.symbol} ({self.exchange}, {self.currency})"
+        return f"{self.symbol} ({self.currency})"
+
+    class Meta:
+        ordering = ['symbol']
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'exchange'], name='unique_instrument_symbol_exchange'),
+            models.CheckConstraint(check=models.Q(lot_size__gte=1), name='instrument_lot_size_gte_1'),
+        ]
+
+
+class FxRate(models.Model):
+    # value of one unit of `currency` expressed in settings.BASE_CURRENCY
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+
+    def __str__(self):
+        return f"{self.date} - {self.currency} - {self.rate}"
+
+    class Meta:
+        ordering = ['currency', '-date']
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'date'], name='unique_fxrate_currency_date'),
+        ]
+
+
+class TradeDetailsQuerySet(models.QuerySet):
+    def with_pnl(self):
+        # db_pnl is computed by the database from the prices, so it is never stale
+        # after queryset.update() and bulk paths need no Python round trip
+        return self.annotate(db_pnl=Case(
+            When(trade_type='Buy', then=(F('exit_price') - F('entry_price')) * F('quantity')),
+            When(trade_type='Sell', then=(F('entry_price') - F('exit_price')) * F('quantity')),
+            default=Value(0),
+            output_field=models.DecimalField(max_digits=20, decimal_places=2),
+        ))
+
+    def with_result(self):
+        # 1 for a win and 0 otherwise, judged on prices so quantity and multiplier don't matter
+        return self.annotate(result=Case(
+            When(trade_type='Buy', then=Case(
+                When(exit_price__gt=F('entry_price'), then=Value(1)),
+                default=Value(0),
+                output_field=models.IntegerField()
+            )),
+            When(trade_type='Sell', then=Case(
+                When(exit_price__lt=F('entry_price'), then=Value(1)),
+                default=Value(0),
+                output_field=models.IntegerField()
+            )),
+            default=Value(0),
+            output_field=models.IntegerField()
+        ))
+
+
+class TradeDetailsManager(models.Manager.from_queryset(TradeDetailsQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().with_pnl()
+
+
+class AbstractTrade(models.Model):
 
     BUY = 'Buy'
     SELL = 'Sell'
@@ -22,12 +96,12 @@ class TradeDetails(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     trade_datetime = models.DateTimeField()
-    trade_symbol = models.CharField(max_length=10)
+    trade_symbol = models.CharField(max_length=32)
+    instrument = models.ForeignKey(Instrument, null=True, blank=True, on_delete=models.SET_NULL)
     trade_type = models.CharField(max_length=4, choices=TRADE_TYPE_CHOICES)
     entry_price = models.DecimalField(max_digits=10, decimal_places=2)
     exit_price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.IntegerField()
-    pnl = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     trade_rationale = models.TextField(null=True, blank=True)
     outcome_analysis = models.TextField(null=True, blank=True)
     emotional_state = models.TextField(null=True, blank=True)
@@ -35,26 +109,99 @@ class TradeDetails(models.Model):
     notes = models.TextField(null=True, blank=True)
     source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='Manual')
 
+    @property
+    def pnl(self):
+        # worked out from the fields, the same way as the db_pnl annotation, so it is also
+        # right for unsaved instances and after prices are edited in memory
+        if self.entry_price is None or self.exit_price is None or self.quantity is None:
+            return None
+        if self.trade_type == self.BUY:
+            return (self.exit_price - self.entry_price) * self.quantity
+        elif self.trade_type == self.SELL:
+            return (self.entry_price - self.exit_price) * self.quantity
+        return 0
+
+    class Meta:
+        abstract = True
 
 
+class TradeDetails(AbstractTrade):
+
+    objects = TradeDetailsManager()
+
     def __str__(self):
         return f"{self.trade_datetime} - {self.trade_symbol} - {self.trade_type}"
 
-    def calculate_pnl(self):
-        if self.trade_type == 'Buy':
-            return (self.exit_price - self.entry_price) * self.quantity
-        elif self.trade_type == 'Sell':
-            return (self.entry_price - self.exit_price) * self.quantity
-        return 0
+    def symbol_matches(self):
+        return list(Instrument.objects.filter(symbol=self.trade_symbol)[:2])
+
+    def resolve_instrument(self):
+        # Link the trade to its instrument by symbol when it was not set explicitly, but only
+        # when the symbol is listed on a single exchange; otherwise the user has to pick one
+        if self.instrument_id is None and self.trade_symbol:
+            matches = self.symbol_matches()
+            if len(matches) == 1:
+                self.instrument = matches[0]
+        return self.instrument
 
     def save(self, *args, **kwargs):
-        self.pnl = self.calculate_pnl()
+        self.resolve_instrument()
         super().save(*args, **kwargs)
 
     def clean(self):
         # Ensure trade_datetime is not set to a future date and time
         if self.trade_datetime > timezone.now():
             raise ValidationError("Trade date and time cannot be in the future.")
+        instrument = self.resolve_instrument()
+        if instrument is None and self.trade_symbol and len(self.symbol_matches()) > 1:
+            raise ValidationError({'instrument': f"{self.trade_symbol} is listed on several exchanges, "
+                                                 f"choose the instrument."})
+        if instrument and instrument.symbol != self.trade_symbol:
+            raise ValidationError({'instrument': f"The instrument does not match the symbol {self.trade_symbol}."})
+        if instrument and self.quantity and self.quantity % instrument.lot_size:
+            raise ValidationError(f"Quantity must be a multiple of the lot size ({instrument.lot_size}).")
 
     class Meta:
         ordering = ['-trade_datetime']
+        indexes = [
+            models.Index(fields=['user', 'trade_datetime']),
+        ]
+
+
+class ArchivedTrade(AbstractTrade):
+    # trades from closed months, moved out of TradeDetails by trades.archive;
+    # the original primary key is kept so a restore is lossless
+    id = models.BigIntegerField(primary_key=True)
+
+    objects = TradeDetailsManager()
+
+    def __str__(self):
+        return f"{self.trade_datetime} - {self.trade_symbol} - {self.trade_type} (archived)"
+
+    class Meta:
+        ordering = ['-trade_datetime']
+        indexes = [
+            models.Index(fields=['user', 'trade_datetime']),
+        ]
+
+
+class TradeArchivePeriod(models.Model):
+    # per-month rollup of archived trades, in settings.BASE_CURRENCY; the running-pnl
+    # extremes let lifetime drawdown be chained exactly across archived months
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField()
+    trade_count = models.IntegerField(default=0)
+    win_count = models.IntegerField(default=0)
+    pnl = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    max_running_pnl = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    min_running_pnl = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    max_drawdown = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+
+    def __str__(self):
+        return f"{self.user} - {self.month:%Y-%m} - {self.trade_count} trades"
+
+    class Meta:
+        ordering = ['user', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='unique_archive_period_user_month'),
+        ]
@@ -0,0 +1,28 @@
+import multiprocessing
+import os
+
+from django.db import connections
+
+
+def _init_worker():
+    import django
+    # spawned workers (macOS/Windows) start without settings loaded; forked ones already have them
+    django.setup()
+    # never reuse a connection inherited from the parent, each worker opens its own
+    connections.close_all()
+
+
+# function to run (func, args) tasks across a process pool, yielding results in task order
+def run_parallel(func, tasks, workers=None):
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        for args in tasks:
+            yield func(*args)
+        return
+
+    # drop the parent's connection before forking so no socket is shared with the workers
+    connections.close_all()
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        results = [pool.apply_async(func, args) for args in tasks]
+        for result in results:
+            yield result.get()
@@ -0,0 +1,237 @@
+import numpy as np
+
+from .fx import FxRates, annotate_contract_pnl, as_date
+from .models import ArchivedTrade, TradeDetails
+from .parallel import run_parallel
+
+# What-if replay of a user's journaled trades. The trades are loaded once into columnar
+# arrays and every rule variant is evaluated as a row of a (variants x trades) matrix,
+# so a thousand variants cost a handful of NumPy passes instead of a thousand loops.
+#
+# A variant is a dict with any of these keys:
+#   name            label for the results (default: "variant <n>")
+#   size            multiplier on the recorded quantity, e.g. 0.5 for half size (default 1)
+#   quantity        fixed quantity for every trade, instead of the recorded one
+#   skip_emotions   skip trades whose emotional_state contains any of these words
+#   symbols         only take trades in these symbols
+#   exclude_symbols skip trades in these symbols
+#   trade_type      only take 'Buy' or 'Sell' trades
+
+VARIANT_KEYS = {'name', 'size', 'quantity', 'skip_emotions', 'symbols', 'exclude_symbols', 'trade_type'}
+
+# upper bound on (variants x trades) cells held in memory per block of variants
+BLOCK_CELLS = 1 << 21
+
+
+class TradeArrays:
+    def __init__(self, timestamps, pnl, unit_pnl, is_buy, is_win, symbol_codes, symbols, emotion_codes, emotions):
+        self.timestamps = timestamps        # datetime64 in UTC, oldest first
+        self.pnl = pnl                      # recorded pnl in the base currency
+        self.unit_pnl = unit_pnl            # pnl of one unit from the prices, in the base currency
+        self.is_buy = is_buy
+        self.is_win = is_win                # won on price, the rule performance() counts wins by
+        self.symbol_codes = symbol_codes    # index into self.symbols
+        self.symbols = symbols
+        self.emotion_codes = emotion_codes  # index into self.emotions (lower-cased emotional_state)
+        self.emotions = emotions
+
+    def __len__(self):
+        return len(self.pnl)
+
+
+# function to load a user's trades, including archived months, into columnar arrays
+def load_trade_arrays(user, include_archived=True):
+    querysets = [TradeDetails.objects.filter(user=user)]
+    if include_archived:
+        querysets.append(ArchivedTrade.objects.filter(user=user))
+
+    rows = []
+    for trades in querysets:
+        rows.extend(annotate_contract_pnl(trades.with_result()).values_list(
+            'trade_datetime', 'id', 'trade_symbol', 'trade_type', 'emotional_state', 'result',
+            'currency', 'trade_date', 'contract_pnl', 'entry_price', 'exit_price', 'instrument__multiplier',
+        ))
+    # same order as performance(): by time, ties broken by id
+    rows.sort(key=lambda row: (row[0], row[1]))
+
+    rates = FxRates()
+    rates.load({row[6] for row in rows})
+    directions = {TradeDetails.BUY: 1, TradeDetails.SELL: -1}
+    pnl = []
+    unit_pnl = []
+    for _, _, _, trade_type, _, _, currency, trade_date, amount, entry_price, exit_price, multiplier in rows:
+        rate = rates(currency, as_date(trade_date))
+        pnl.append(float(amount * rate))
+        # taken from the prices rather than pnl / quantity, so a fixed quantity also
+        # applies to trades recorded with quantity 0
+        move = (exit_price - entry_price) * directions.get(trade_type, 0)
+        unit_pnl.append(float(move * (multiplier or 1) * rate))
+
+    symbols, symbol_codes = np.unique(np.array([row[2] for row in rows], dtype=object), return_inverse=True)
+    emotions, emotion_codes = np.unique(np.array([(row[4] or '').lower() for row in rows], dtype=object),
+                                        return_inverse=True)
+    return TradeArrays(
+        timestamps=np.array([row[0].replace(tzinfo=None) for row in rows], dtype='datetime64[us]'),
+        pnl=np.array(pnl, dtype=np.float64),
+        unit_pnl=np.array(unit_pnl, dtype=np.float64),
+        is_buy=np.array([row[3] == TradeDetails.BUY for row in rows], dtype=bool),
+        is_win=np.array([row[5] == 1 for row in rows], dtype=bool),
+        symbol_codes=symbol_codes,
+        symbols=symbols,
+        emotion_codes=emotion_codes,
+        emotions=emotions,
+    )
+
+
+def _check_variant(variant, n):
+    if not isinstance(variant, dict):
+        raise ValueError(f"Variant {n + 1} must be an object, got {type(variant).__name__}")
+    label = variant.get('name') or f"variant {n + 1}"
+
+    unknown = set(variant) - VARIANT_KEYS
+    if unknown:
+        raise ValueError(f"{label}: unknown keys {', '.join(sorted(unknown))}")
+    if not isinstance(label, str):
+        raise ValueError(f"{label}: name must be a string")
+    for key in ('size', 'quantity'):
+        if key in variant:
+            value = variant[key]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value) or value < 0:
+                raise ValueError(f"{label}: {key} must be a non-negative number, got {value!r}")
+    for key in ('skip_emotions', 'symbols', 'exclude_symbols'):
+        if key in variant:
+            value = variant[key]
+            if not isinstance(value, (list, tuple)) or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"{label}: {key} must be a list of strings, got {value!r}")
+    if 'trade_type' in variant and variant['trade_type'] not in (TradeDetails.BUY, TradeDetails.SELL):
+        raise ValueError(f"{label}: trade_type must be '{TradeDetails.BUY}' or '{TradeDetails.SELL}', "
+                         f"got {variant['trade_type']!r}")
+
+
+# function to check a list of variants, raising ValueError that names the offending variant
+def validate_variants(variants):
+    if not isinstance(variants, (list, tuple)):
+        raise ValueError(f"Variants must be a list of objects, got {type(variants).__name__}")
+    for n, variant in enumerate(variants):
+        _check_variant(variant, n)
+
+
+def _variant_mask(arrays, variant, cache):
+    # masks are cached per rule value so variants that share a filter reuse it
+    mask = np.ones(len(arrays), dtype=bool)
+
+    words = tuple(sorted(word.lower() for word in variant.get('skip_emotions') or ()))
+    if words:
+        key = ('skip_emotions', words)
+        if key not in cache:
+            hit = np.array([any(word in text for word in words) for text in arrays.emotions], dtype=bool)
+            cache[key] = ~hit[arrays.emotion_codes]
+        mask &= cache[key]
+
+    for rule in ('symbols', 'exclude_symbols'):
+        symbols = tuple(sorted(variant.get(rule) or ()))
+        if symbols:
+            key = (rule, symbols)
+            if key not in cache:
+                hit = np.isin(arrays.symbols, symbols)[arrays.symbol_codes]
+                cache[key] = hit if rule == 'symbols' else ~hit
+            mask &= cache[key]
+
+    trade_type = variant.get('trade_type')
+    if trade_type:
+        mask &= arrays.is_buy if trade_type == TradeDetails.BUY else ~arrays.is_buy
+
+    return mask
+
+
+def _variant_pnl(arrays, variants, taken):
+    # pnl of every trade under every variant: recorded pnl times a size factor, or the
+    # per-unit pnl times a fixed quantity; skipped trades contribute nothing
+    fixed = np.array([variant.get('quantity') is not None for variant in variants])
+    factor = np.array([float(variant['quantity']) if is_fixed else float(variant.get('size', 1))
+                       for variant, is_fixed in zip(variants, fixed)])
+    pnl = taken * factor[:, None]
+    if fixed.any():
+        pnl *= np.where(fixed[:, None], arrays.unit_pnl, arrays.pnl)
+    else:
+        pnl *= arrays.pnl
+    return pnl
+
+
+def _block_stats(variants, taken, pnl, is_win, timestamps):
+    rows = np.arange(len(variants))
+    trade_counts = taken.sum(axis=1)
+    # a win is judged on price as in performance(), so a winning trade stays a win at any size
+    win_counts = (taken & is_win).sum(axis=1)
+
+    # like performance(), the running peak starts at the first trade actually taken:
+    # moving that trade's pnl to column 0 makes equity flat at that value until then
+    first = taken.argmax(axis=1)
+    first_pnl = pnl[rows, first]
+    pnl[rows, first] = 0.0
+    pnl[:, 0] = first_pnl
+
+    equity = np.cumsum(pnl, axis=1, out=pnl)
+    drawdown = np.maximum.accumulate(equity, axis=1)
+    peak = drawdown[:, -1].copy()
+    np.subtract(drawdown, equity, out=drawdown)
+    worst = drawdown.argmax(axis=1)
+
+    results = []
+    for row, variant in enumerate(variants):
+        trades = int(trade_counts[row])
+        peak_value = float(peak[row]) if trades else 0.0
+        max_drawdown = float(drawdown[row, worst[row]])
+        results.append({
+            'name': variant['name'],
+            'trades': trades,
+            'wins': int(win_counts[row]),
+            'win_rate': float(win_counts[row] / trades * 100) if trades else 0.0,
+            'total_pnl': float(equity[row, -1]),
+            'peak_equity': peak_value,
+            'max_drawdown': max_drawdown,
+            'max_drawdown_percentage': max_drawdown / peak_value * 100 if peak_value else 0.0,
+            'max_drawdown_at': timestamps[worst[row]].item() if max_drawdown else None,
+        })
+    return results
+
+
+def _name_variants(variants):
+    return [dict(variant, name=variant.get('name') or f"variant {n + 1}") for n, variant in enumerate(variants)]
+
+
+# function to evaluate rule variants against loaded trades, returns one stats dict per variant
+def evaluate_variants(arrays, variants):
+    validate_variants(variants)
+    variants = _name_variants(variants)
+
+    if len(arrays) == 0:
+        taken = np.zeros((len(variants), 1), dtype=bool)
+        return _block_stats(variants, taken, np.zeros(taken.shape), np.zeros(1, dtype=bool),
+                            np.zeros(1, dtype='datetime64[us]'))
+
+    block = max(1, BLOCK_CELLS // len(arrays))
+    cache = {}
+    results = []
+    for start in range(0, len(variants), block):
+        chunk = variants[start:start + block]
+        taken = np.stack([_variant_mask(arrays, variant, cache) for variant in chunk])
+        results.extend(_block_stats(chunk, taken, _variant_pnl(arrays, chunk, taken), arrays.is_win,
+                                    arrays.timestamps))
+    return results
+
+
+# function to evaluate variants, split across `workers` processes when there are many
+def replay(arrays, variants, workers=1):
+    validate_variants(variants)
+    if not variants:
+        return []
+    # name variants up front so default names stay numbered across worker chunks
+    variants = _name_variants(variants)
+    workers = max(1, min(workers, len(variants)))
+    size = -(-len(variants) // workers)
+    tasks = [(arrays, variants[start:start + size]) for start in range(0, len(variants), size)]
+    results = []
+    for chunk_results in run_parallel(evaluate_variants, tasks, workers):
+        results.extend(chunk_results)
+    return results
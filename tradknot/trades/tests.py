@@ -1,3 +1,281 @@
+import io
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import replay as replay_module
+from .archive import archive_trades, restore_trades
+from .fx import FxRateMissing, FxRates, load_fx_rates
+from .models import ArchivedTrade, FxRate, Instrument, TradeArchivePeriod, TradeDetails
+from .replay import evaluate_variants, load_trade_arrays, replay
+
+PERFORMANCE_KEYS = ['total_sum', 'win_count', 'loss_count', 'max_drawdown', 'max_dd_percentage']
+
+
+class TradeTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='trader', password='secret-pass-123')
+        self.client.force_login(self.user)
+
+        # January sets the lifetime peak, the trough comes in February
+        self.add_trade(2023, 1, 3, 'Buy', 100, 110, 10)      # +100
+        self.add_trade(2023, 1, 17, 'Sell', 100, 103, 10)    # -30
+        self.add_trade(2023, 2, 6, 'Buy', 100, 80, 10)       # -200
+        self.add_trade(2023, 2, 6, 'Buy', 100, 120, 0)       # win on price, no pnl
+        self.add_trade(2023, 2, 20, 'Sell', 100, 95, 10)     # +50
+        self.add_trade(2023, 3, 8, 'Buy', 50, 90, 10)        # +400
+        self.add_trade(2023, 3, 22, 'Buy', 100, 99, 10)      # -10
+        self.add_trade(2023, 4, 5, 'Sell', 100, 110, 5)      # -50
+
+    def add_trade(self, year, month, day, trade_type, entry_price, exit_price, quantity, symbol='TEST'):
+        return TradeDetails.objects.create(
+            user=self.user,
+            trade_datetime=timezone.make_aware(datetime(year, month, day, 10)),
+            trade_symbol=symbol,
+            trade_type=trade_type,
+            entry_price=entry_price,
+            exit_price=exit_price,
+            quantity=quantity,
+        )
+
+    def performance(self):
+        response = self.client.get(reverse('performance'))
+        self.assertEqual(response.status_code, 200)
+        return {key: response.context[key] for key in PERFORMANCE_KEYS}
+
+    def assertSamePerformance(self, actual, expected):
+        for key in PERFORMANCE_KEYS:
+            self.assertAlmostEqual(float(actual[key]), float(expected[key]), places=6, msg=key)
+
+
+class TradeArchiveTests(TradeTestCase):
+
+    def test_archive_and_restore_keep_lifetime_metrics(self):
+        before = self.performance()
+        self.assertEqual(before['win_count'], 4)
+        self.assertEqual(before['loss_count'], 4)
+        self.assertAlmostEqual(float(before['max_drawdown']), 230)
+
+        # January and February go to the archive: the drawdown spans the month boundary
+        self.assertEqual(archive_trades(self.user, date(2023, 3, 1)), 5)
+        self.assertEqual(TradeDetails.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(TradeArchivePeriod.objects.filter(user=self.user).count(), 2)
+        self.assertSamePerformance(self.performance(), before)
+
+        self.assertEqual(restore_trades(self.user), 5)
+        self.assertFalse(ArchivedTrade.objects.filter(user=self.user).exists())
+        self.assertFalse(TradeArchivePeriod.objects.filter(user=self.user).exists())
+        self.assertSamePerformance(self.performance(), before)
+
+    def test_rearchiving_a_backdated_month_rebuilds_its_rollup(self):
+        archive_trades(self.user, date(2023, 4, 1))
+
+        # a trade backdated into the archived February, between the peak and the trough
+        self.add_trade(2023, 2, 1, 'Buy', 100, 70, 10)       # -300
+        archive_trades(self.user, date(2023, 4, 1))
+        self.assertEqual(TradeArchivePeriod.objects.get(user=self.user, month=date(2023, 2, 1)).trade_count, 4)
+        archived = self.performance()
+
+        restore_trades(self.user)
+        restored = self.performance()
+        self.assertSamePerformance(archived, restored)
+        self.assertAlmostEqual(float(restored['max_drawdown']), 530)
+
+    def test_fx_corrections_rebuild_archived_months(self):
+        load_fx_rates(io.StringIO("date,currency,rate\n2023-01-02,USD,80\n"))
+        Instrument.objects.create(symbol='ES', exchange='CME', currency='USD')
+        self.add_trade(2023, 1, 10, 'Buy', 100, 101, 1, symbol='ES')     # 1 USD
+        self.add_trade(2023, 3, 10, 'Sell', 100, 101, 2, symbol='ES')    # -2 USD
+        archive_trades(self.user, date(2023, 4, 1))
+
+        # a corrected rate for February onwards: March is rebuilt, January is untouched
+        self.assertEqual(load_fx_rates(io.StringIO("date,currency,rate\n2023-02-01,USD,90\n")), (1, 1))
+        self.assertEqual(load_fx_rates(io.StringIO("date,currency,rate\n2023-02-01,USD,90\n")), (1, 0))
+        archived = self.performance()
+        self.assertAlmostEqual(float(archived['total_sum']), 260 + 80 - 180)
+
+        restore_trades(self.user)
+        self.assertSamePerformance(archived, self.performance())
+
+    def test_open_month_cannot_be_archived(self):
+        next_month = timezone.localdate().replace(day=28) + timedelta(days=4)
+        with self.assertRaises(ValueError):
+            archive_trades(self.user, next_month)
+        self.assertFalse(ArchivedTrade.objects.filter(user=self.user).exists())
+
+
+class TradeReplayTests(TradeTestCase):
+
+    def replay_one(self, variant):
+        return evaluate_variants(load_trade_arrays(self.user), [variant])[0]
+
+    def assertMatchesPerformance(self, result, performance):
+        self.assertEqual(result['wins'], performance['win_count'])
+        self.assertEqual(result['trades'] - result['wins'], performance['loss_count'])
+        self.assertAlmostEqual(result['total_pnl'], float(performance['total_sum']))
+        self.assertAlmostEqual(result['max_drawdown'], float(performance['max_drawdown']))
+        self.assertAlmostEqual(result['max_drawdown_percentage'], float(performance['max_dd_percentage']))
+
+    def test_recorded_variant_matches_performance(self):
+        self.assertMatchesPerformance(self.replay_one({'name': 'recorded'}), self.performance())
+
+        # archived months are replayed from their trades, not their rollups
+        archive_trades(self.user, date(2023, 3, 1))
+        self.assertMatchesPerformance(self.replay_one({'name': 'recorded'}), self.performance())
+
+    def test_fixed_quantity_uses_the_price_move(self):
+        # per unit: +10, -3, -20, +20 (recorded with quantity 0), +5, +40, -1, -10
+        result = self.replay_one({'quantity': 1})
+        self.assertEqual(result['wins'], 4)
+        self.assertAlmostEqual(result['total_pnl'], 41)
+        self.assertAlmostEqual(result['peak_equity'], 52)
+        self.assertAlmostEqual(result['max_drawdown'], 23)
+
+    def test_filters(self):
+        TradeDetails.objects.filter(entry_price=100, exit_price=80).update(emotional_state='FOMO after a loss')
+        result = self.replay_one({'skip_emotions': ['fomo']})
+        self.assertEqual(result['trades'], 7)
+        self.assertAlmostEqual(result['total_pnl'], 460)
+        self.assertAlmostEqual(result['max_drawdown'], 60)
+
+        result = self.replay_one({'trade_type': 'Sell', 'size': 0.5})
+        self.assertEqual((result['trades'], result['wins']), (3, 1))
+        self.assertAlmostEqual(result['total_pnl'], -15)
+        self.assertAlmostEqual(result['max_drawdown'], 25)
+
+        result = self.replay_one({'exclude_symbols': ['TEST']})
+        self.assertEqual(result['trades'], 0)
+        self.assertEqual(result['total_pnl'], 0)
+        self.assertIsNone(result['max_drawdown_at'])
+
+    def test_running_peak_starts_at_the_first_taken_trade(self):
+        # only losing trades: the peak is the first of them, not zero before it
+        losses = [timezone.make_aware(datetime(2023, month, day, 10)) for month, day in [(1, 17), (3, 22), (4, 5)]]
+        TradeDetails.objects.filter(trade_datetime__in=losses).update(trade_symbol='LOSS')
+        result = self.replay_one({'symbols': ['LOSS']})
+        self.assertEqual(result['trades'], 3)
+        self.assertAlmostEqual(result['peak_equity'], -30)
+        self.assertAlmostEqual(result['max_drawdown'], 60)
+        self.assertEqual(result['max_drawdown_at'], datetime(2023, 4, 5, 10))
+
+    def test_blocks_give_the_same_results(self):
+        arrays = load_trade_arrays(self.user)
+        variants = [{'size': size, 'trade_type': trade_type}
+                    for size in (0, 0.5, 1, 2) for trade_type in ('Buy', 'Sell')]
+        expected = evaluate_variants(arrays, variants)
+        # one variant per block
+        with mock.patch.object(replay_module, 'BLOCK_CELLS', len(arrays)):
+            self.assertEqual(evaluate_variants(arrays, variants), expected)
+
+    def test_no_trades(self):
+        other = User.objects.create_user(username='new-trader', password='secret-pass-123')
+        results = replay(load_trade_arrays(other), [{}, {'size': 2}])
+        self.assertEqual([result['name'] for result in results], ['variant 1', 'variant 2'])
+        for result in results:
+            self.assertEqual((result['trades'], result['total_pnl'], result['max_drawdown']), (0, 0.0, 0.0))
+
+    def test_variants_are_validated_and_named(self):
+        arrays = load_trade_arrays(self.user)
+        self.assertEqual(evaluate_variants(arrays, [{}])[0]['name'], 'variant 1')
+        for variants in ([{'size': -1}], [{'quantity': 'ten'}], [{'symbols': 'TEST'}],
+                         [{'trade_type': 'buy'}], [{'sizes': 2}], [[]], {'size': 1}):
+            with self.assertRaises(ValueError, msg=variants):
+                evaluate_variants(arrays, variants)
+
+
+class TradePnlTests(TradeTestCase):
+
+    def test_pnl_on_created_loaded_and_edited_trades(self):
+        trade = self.add_trade(2023, 5, 2, 'Sell', 100, 90, 3)
+        self.assertEqual(trade.pnl, 30)
+
+        loaded = TradeDetails.objects.get(pk=trade.pk)
+        self.assertEqual(loaded.pnl, loaded.db_pnl)
+        loaded.exit_price = 110
+        self.assertEqual(loaded.pnl, -30)
+        self.assertIsNone(TradeDetails(trade_type='Buy').pnl)
+
+
+class FxConversionTests(TradeTestCase):
+
+    RATES = "date,currency,rate\n2023-06-01, usd ,80.5\n2023-06-02,USD,81\n"
+
+    def test_load_fx_rates_parses_and_upserts(self):
+        self.assertEqual(load_fx_rates(io.StringIO(self.RATES)), (2, 0))
+        self.assertEqual(FxRate.objects.get(currency='USD', date=date(2023, 6, 1)).rate, Decimal('80.5'))
+
+        # loading a correction updates the rate in place
+        load_fx_rates(io.BytesIO(b"date,currency,rate\n2023-06-01,USD,80.25\n"))
+        self.assertEqual(FxRate.objects.filter(currency='USD').count(), 2)
+        self.assertEqual(FxRate.objects.get(currency='USD', date=date(2023, 6, 1)).rate, Decimal('80.25'))
+
+        with self.assertRaises(ValueError):
+            load_fx_rates(io.StringIO("date,currency,rate\n06/01/2023,USD,80\n"))
+
+    def test_weekends_fall_back_to_the_last_rate(self):
+        load_fx_rates(io.StringIO(self.RATES))
+        rates = FxRates()
+        self.assertEqual(rates('USD', date(2023, 6, 2)), Decimal(81))
+        self.assertEqual(rates('USD', date(2023, 6, 4)), Decimal(81))  # Sunday
+        self.assertEqual(rates('INR', date(2023, 6, 4)), Decimal(1))
+        with self.assertRaises(FxRateMissing):
+            rates('USD', date(2023, 5, 31))
+
+    def test_performance_converts_with_the_multiplier(self):
+        load_fx_rates(io.StringIO(self.RATES))
+        Instrument.objects.create(symbol='ES', exchange='CME', currency='USD', multiplier=50)
+        self.add_trade(2023, 6, 2, 'Buy', 100, 102, 1, symbol='ES')     # 2 * 50 * 81 = 8100
+        self.add_trade(2023, 6, 3, 'Sell', 100, 101, 1, symbol='ES')    # -1 * 50 * 81 = -4050
+
+        with CaptureQueriesContext(connection) as queries:
+            performance = self.performance()
+        self.assertEqual(performance['total_sum'], 260 + 8100 - 4050)
+        # all rates come from a single query, however many trade days there are
+        self.assertEqual(sum('trades_fxrate' in query['sql'] for query in queries.captured_queries), 1)
+
+    def test_performance_reports_a_missing_rate(self):
+        Instrument.objects.create(symbol='ES', exchange='CME', currency='USD')
+        self.add_trade(2023, 6, 2, 'Buy', 100, 102, 1, symbol='ES')
+
+        response = self.client.get(reverse('performance'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('No FX rate for USD', ' '.join(str(message) for message in response.context['messages']))
+
+    def test_resolve_instrument(self):
+        listed = Instrument.objects.create(symbol='INFY', exchange='NSE', currency='INR')
+        self.assertEqual(self.add_trade(2023, 6, 2, 'Buy', 1, 2, 1, symbol='INFY').instrument, listed)
+
+        # listed on two exchanges: not linked, and the form has to ask which one
+        Instrument.objects.create(symbol='INFY', exchange='NYSE', currency='USD')
+        trade = TradeDetails(user=self.user, trade_datetime=timezone.now(), trade_symbol='INFY',
+                             trade_type='Buy', entry_price=1, exit_price=2, quantity=1)
+        self.assertIsNone(trade.resolve_instrument())
+        with self.assertRaises(ValidationError) as raised:
+            trade.clean()
+        self.assertIn('instrument', raised.exception.message_dict)
+
+        trade.trade_symbol = 'TCS'
+        trade.instrument = listed
+        with self.assertRaises(ValidationError):
+            trade.clean()
+
+    def test_lot_size(self):
+        with self.assertRaises(ValidationError):
+            Instrument(symbol='NIFTY', currency='INR', lot_size=0).full_clean()
 
-# Create your tests here.
+        Instrument.objects.create(symbol='NIFTY', currency='INR', lot_size=50)
+        trade = TradeDetails(user=self.user, trade_datetime=timezone.now(), trade_symbol='NIFTY',
+                             trade_type='Buy', entry_price=1, exit_price=2, quantity=75)
+        with self.assertRaises(ValidationError):
+            trade.clean()
+        trade.quantity = 100
+        trade.clean()
@@ -1,17 +1,19 @@
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from .models import TradeDetails
+from .models import TradeDetails, TradeArchivePeriod
 from django.contrib.auth.models import User
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, DecimalField, Case, When, Count, F, Value, IntegerField, Q
+from django.db.models import Count, Q
 from django.contrib import messages
 from .forms import TradeDetailsForm  # Ensure you have a form defined for TradeDetails
+from .fx import FxRateMissing, FxRates, iter_pnl_in_base, total_pnl_in_base
+from .archive import fold_periods
 from django.views.generic.edit import View
-import csv
 from django.urls import reverse
-from django.utils.dateparse import parse_datetime
+from django.http import HttpResponse
 
 
 # trade create view class
@@ -78,20 +80,19 @@ def home(request):
     return render(request, 'trades/home.html')
 
 
-# function to calculate portfolio values
-def calculate_portfolio_values():
-    trades = TradeDetails.objects.all().order_by('trade_datetime')
+# function to calculate portfolio values in the base currency, continuing from `start`
+def calculate_portfolio_values(user, start=0, rates=None):
+    trades = TradeDetails.objects.filter(user=user)
     portfolio_values = []
-    cumulative_pnl = 0
-    for trade in trades:
-        cumulative_pnl += trade.pnl
+    cumulative_pnl = start
+    for pnl in iter_pnl_in_base(trades, rates):
+        cumulative_pnl += pnl
         portfolio_values.append(cumulative_pnl)
     return portfolio_values
 
 
-# function to calculate maximum drawdown
-def calculate_maximum_drawdown(portfolio_values):
-    max_drawdown = 0
+# function to calculate maximum drawdown, continuing from an earlier drawdown
+def calculate_maximum_drawdown(portfolio_values, max_drawdown=0):
     if not portfolio_values:
         return None
     peak_value = portfolio_values[0]
@@ -116,37 +117,26 @@ def calculate_maximum_drawdown_percentage(max_drawdown, peak_value):
 # function to track performance of trades
 @login_required
 def performance(request):
-    # Annotate each row with the calculation (entry_price + exit_price) * quantity
-    annotated_queryset = TradeDetails.objects.filter(user=request.user).annotate(
-        calculated_value=Case(
-            When(trade_type='Sell', then=(F('entry_price') - F('exit_price'))),
-            When(trade_type='Buy', then=(F('exit_price') - F('entry_price'))),
-            output_field=DecimalField()
-        ),
-        total_value=F('calculated_value') * F('quantity')
-    )
-
-    # Aggregate the total of the annotated field
-    total_sum = annotated_queryset.aggregate(total_sum=Sum('total_value'))
+    trades = TradeDetails.objects.filter(user=request.user)
+
+    # Archived months only contribute their rollups; the trades table holds recent trades
+    periods = list(TradeArchivePeriod.objects.filter(user=request.user))
+    archived_pnl, archived_peak, archived_drawdown = fold_periods(periods)
+
+    # Total pnl converted to the base currency; trades in other currencies are
+    # summed per (currency, date) in the database and converted once per group,
+    # with the rates fetched once for this request
+    rates = FxRates()
+    try:
+        total_sum = archived_pnl + total_pnl_in_base(trades, rates)
+        portfolio_values = calculate_portfolio_values(request.user, archived_pnl, rates)
+    except FxRateMissing as e:
+        messages.error(request, f'{e}. Load rates with "manage.py load_fx_rates".')
+        total_sum = archived_pnl
+        portfolio_values = []
 
     # Annotate each trade with whether it's a win or loss
-    trades = TradeDetails.objects.filter(user=request.user)
-    annotated_trades = trades.annotate(
-        result=Case(
-            When(trade_type='Buy', then=Case(
-                When(exit_price__gt=F('entry_price'), then=Value(1)),
-                default=Value(0),
-                output_field=IntegerField()
-            )),
-            When(trade_type='Sell', then=Case(
-                When(exit_price__lt=F('entry_price'), then=Value(1)),
-                default=Value(0),
-                output_field=IntegerField()
-            )),
-            default=Value(0),
-            output_field=IntegerField()
-        )
-    )
+    annotated_trades = trades.with_result()
 
     # Count wins and losses
     win_count = annotated_trades.aggregate(win_count=Count('id', filter=Q(result=1)))['win_count']
@@ -154,14 +144,16 @@ def performance(request):
     total_count = annotated_trades.count()
 
     # Calculate Win/Loss Ratio
-    win_count = win_count or 0
-    loss_count = loss_count or 0
+    win_count = (win_count or 0) + sum(period.win_count for period in periods)
+    loss_count = (loss_count or 0) + sum(period.trade_count - period.win_count for period in periods)
+    total_count += sum(period.trade_count for period in periods)
     win_rate = (win_count / total_count * 100) if total_count > 0 else 0  # Handle division by zero
 
     # Calculate Maximum Drawdown
-    portfolio_values = calculate_portfolio_values()
+    if archived_peak is not None:
+        portfolio_values = [archived_peak] + portfolio_values
     if portfolio_values:
-        max_drawdown = calculate_maximum_drawdown(portfolio_values)
+        max_drawdown = calculate_maximum_drawdown(portfolio_values, max_drawdown=archived_drawdown)
         peak_value = max(portfolio_values)
         max_drawdown_percentage = calculate_maximum_drawdown_percentage(max_drawdown, peak_value)
     else:
@@ -169,7 +161,8 @@ def performance(request):
         max_drawdown_percentage = 0
 
     return render(request, 'trades/performance.html', {
-        'total_sum': total_sum['total_sum'] or 0,
+        'total_sum': total_sum,
+        'base_currency': settings.BASE_CURRENCY,
         'win_count': win_count,
         'loss_count': loss_count,
         'win_rate': win_rate,
@@ -178,9 +171,6 @@ def performance(request):
     })
 
 
-import pandas as pd
-from decimal import Decimal
-
 def upload_csv(request):
     if request.method == 'POST':
         csv_file = request.FILES.get('csv_file')
@@ -188,98 +178,16 @@ def upload_csv(request):
         if not csv_file.name.endswith('.csv'):
             return HttpResponse('File is not CSV format', status=400)
 
-        df = pd.read_csv(csv_file)
-
-        # Initialize list to store results
-        results = []
-
-        engaged_symbol = []
-
-        for index, row_x in df.iterrows():
-            if row_x['symbol'] in engaged_symbol:
-                continue
-
-            df_filt = df[df.symbol == row_x['symbol']]
-
-            unrealised_value = 0
-            unrealised_qty = 0
-            total_buy_value = 0
-            total_sell_value = 0
-            tot_buy_qty = 0
-            tot_sell_qty = 0
-
-            for _, row in df_filt.iterrows():
-                if row.trade_type == 'buy':
-                    tot_buy_qty += row.quantity
-                    unrealised_qty += row.quantity
-                    total_buy_value += row.quantity * row.price
-                    unrealised_value += row.quantity * row.price
-                else:
-                    tot_sell_qty += row.quantity
-                    unrealised_qty -= row.quantity
-                    total_sell_value += row.quantity * row.price
-                    unrealised_value -= row.quantity * row.price
-
-            # Skip processing if there's no buy or sell
-            if tot_buy_qty == 0 or tot_sell_qty == 0:
-                continue
-
-            realised_qty = max((tot_buy_qty + tot_sell_qty - abs(unrealised_qty)) / 2, 1)
-
-            buy_avg = round(total_buy_value / tot_buy_qty, 2)
-            sell_avg = round(total_sell_value / realised_qty, 2) if unrealised_qty <= 0 else round(
-                total_sell_value / tot_sell_qty, 2)
-
-            realised_pnl = (sell_avg - buy_avg) * realised_qty
-
-            # Append results to the list
-            results.append({
-                'order_execution_time': row_x.order_execution_time,
-                'symbol': row_x.symbol,
-                'type': row_x.trade_type,
-                'buy_avg': buy_avg,
-                'sell_avg': sell_avg,
-                'qty': realised_qty,
-                'realised_pnl': realised_pnl
-            })
-
-            engaged_symbol.append(row_x['symbol'])
-
-        # Create DataFrame from results
-        df_results = pd.DataFrame(results)
-
-
-        # decoded_file = df_results.read().decode('utf-8').splitlines()
-        # csv_reader = csv.reader(decoded_file)
-        #
-        # next(csv_reader)  # Skip the title row
-
-        for index, row in df_results.iterrows():
-            try:
-                # Extract necessary fields from CSV
-                trade_datetime = parse_datetime(row[0])
-                trade_symbol = row[1]
-                trade_type = row[2].capitalize()  # 'Buy' or 'Sell'
-                entry_price = Decimal(row[3])     # Convert to Decimal
-                exit_price = Decimal(row[4])     # Convert to Decimal
-                quantity = int(float(row[5]))
-
-                trade = TradeDetails(
-                    user=request.user,
-                    trade_datetime=trade_datetime,
-                    trade_symbol=trade_symbol,
-                    trade_type=trade_type,
-                    entry_price=entry_price,
-                    exit_price=exit_price,  # Exit price as Decimal
-                    quantity=quantity,
-                    source='CSV'
-                )
-                trade.save()
-
-
-            except Exception as e:
-                print(f"Error processing row: {row}, error: {e}")
-                continue
+        # imported here so web workers only load pandas once someone uploads a tradebook
+        from .importer import import_tradebook
+        try:
+            count, errors = import_tradebook(request.user, csv_file)
+        except ValueError as e:
+            messages.error(request, f'Could not import {csv_file.name}: {e}')
+            return redirect(reverse('addtrade'))
+        messages.success(request, f'Imported {count} trades.')
+        if errors:
+            messages.warning(request, f'Skipped {len(errors)} rows: ' + '; '.join(errors[:5]))
 
         return redirect(reverse('tradebook'))
 
@@ -145,6 +145,10 @@ STATIC_URL = '/static/'
 #     os.path.join(BASE_DIR, 'static'),
 # ]
 
+# Currency that performance figures are reported in; trades in other
+# currencies are converted with the rates in trades.FxRate
+BASE_CURRENCY = 'INR'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 